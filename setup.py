@@ -18,6 +18,19 @@ except VersionConflict:
     print("Error: version of setuptools is too old (<38.3)!")
     sys.exit(1)
 
+ext_modules = []
+try:
+    from glob import glob
+
+    from Cython.Build import cythonize
+
+    # an sdist built without Cython ships no .pyx files and cythonize
+    # raises ValueError on an empty glob, so only call it if they exist
+    if glob("src/mmdemultiplex/*.pyx"):
+        ext_modules = cythonize("src/mmdemultiplex/*.pyx")
+except ImportError:
+    pass
+
 
 if __name__ == "__main__":
-    setup(use_pyscaffold=False)
+    setup(use_pyscaffold=False, ext_modules=ext_modules)
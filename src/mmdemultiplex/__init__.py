@@ -13,6 +13,6 @@ finally:
 
 from .demultiplex import Demultiplexer
 from .strategies import PE_Decide_On_Start_Trim_Start_End, DemultiplexStrategy
-from .util import Fragment, Read, get_df_callable_for_demultiplexer
+from .util import Fragment, FragmentBatch, Read, get_df_callable_for_demultiplexer
 from .samples import DemultiplexInputSample
 from .plots import *
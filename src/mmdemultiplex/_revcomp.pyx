@@ -0,0 +1,54 @@
+# cython: language_level=3
+# -*- coding: utf-8 -*-
+
+"""_revcomp.pyx: Single-pass C kernel for reverse complementing sequences.
+
+Fuses the reverse and the complement-translate step into one loop that
+reads the input from the front and writes the complement into the output
+buffer back to front, so only a single sequence-length allocation is
+needed (the pure python ``sequence[::-1].translate(...)`` allocates twice
+and walks the string twice).
+"""
+
+cdef extern from "Python.h":
+    object PyUnicode_New(Py_ssize_t size, Py_UCS4 maxchar)
+    void* PyUnicode_DATA(object o)
+    Py_ssize_t PyUnicode_GET_LENGTH(object o)
+    bint PyUnicode_IS_ASCII(object o)
+
+__author__ = "Marco Mernberger"
+__copyright__ = "Copyright (c) 2020 Marco Mernberger"
+__license__ = "mit"
+
+
+def revcomp(str sequence, bytes table):
+    """
+    revcomp returns the reverse complement of an ascii sequence.
+
+    The complement is taken from table, a 256 entry translate table as
+    produced by bytes.maketrans. Non-ascii input falls back to the
+    equivalent reverse-and-translate python path.
+
+    Parameters
+    ----------
+    sequence : str
+        Input sequence.
+    table : bytes
+        256 byte translation table mapping each base to its complement.
+
+    Returns
+    -------
+    str
+        Reverse complement of input sequence.
+    """
+    if not PyUnicode_IS_ASCII(sequence):
+        return sequence[::-1].translate(table)
+    cdef Py_ssize_t n = PyUnicode_GET_LENGTH(sequence)
+    cdef const unsigned char* lut = table
+    cdef const unsigned char* src = <const unsigned char*> PyUnicode_DATA(sequence)
+    result = PyUnicode_New(n, 127)
+    cdef unsigned char* dst = <unsigned char*> PyUnicode_DATA(result)
+    cdef Py_ssize_t i
+    for i in range(n):
+        dst[n - 1 - i] = lut[src[i]]
+    return result
@@ -3,7 +3,7 @@
 
 """adapters.py: Contains adapter classes and an interface to cutadapt."""
 
-from typing import Union, Literal
+from typing import List, Union, Literal
 import cutadapt
 import cutadapt.align
 import collections
@@ -38,6 +38,37 @@ WHERE_BOTH = (
 WHERE_NONE = cutadapt.align.START_WITHIN_SEQ2 | cutadapt.align.STOP_WITHIN_SEQ2
 
 
+def kmer_chunks(sequence: str, number_of_chunks: int) -> List[str]:
+    """
+    kmer_chunks splits a sequence into contiguous, roughly equal sized chunks.
+
+    If a sequence occurs somewhere with at most k errors, at least one of
+    k+1 such chunks must occur there exactly (pigeonhole principle), which
+    makes the chunks usable as a fast presence prefilter before the
+    error-tolerant alignment.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to split.
+    number_of_chunks : int
+        The number of chunks to split into.
+
+    Returns
+    -------
+    List[str]
+        The chunks, in order.
+    """
+    chunk_size, remainder = divmod(len(sequence), number_of_chunks)
+    chunks = []
+    start = 0
+    for index in range(number_of_chunks):
+        stop = start + chunk_size + (1 if index < remainder else 0)
+        chunks.append(sequence[start:stop])
+        start = stop
+    return chunks
+
+
 class Adapter:
     def __init__(
         self,
@@ -81,6 +112,9 @@ class Adapter:
             self.orient_read = lambda x: x[::-1]
             self.factor = -1
             self.index_adapter_end = not self.index_adapter_end
+        # ascii-encoded copy, so byte-oriented callers can match without
+        # driving the unicode machinery per comparison
+        self.adapter_bytes = self.adapter_sequence.encode("ascii")
         self.maximal_number_of_errors = maximal_number_of_errors
         self.minimal_overlap = minimal_overlap
         if self.minimal_overlap is None:
@@ -95,12 +129,27 @@ class Adapter:
             else:
                 self.locate = self.cutadapt_locate
                 self.error_rate = self.maximal_number_of_errors / float(self.minimal_overlap)
+                # cutadapt's Aligner is a compiled, banded edit-distance DP that is
+                # built once per adapter here and reused for every read. It also
+                # picks the match with the most matching bases among all <= k error
+                # candidates and handles minimal_overlap partials at the read
+                # boundaries - semantics the locate tests rely on and which a plain
+                # first-hit bit-vector matcher (Myers) would not reproduce.
                 self.adapter = cutadapt.align.Aligner(
                     self.adapter_sequence,
                     self.error_rate,
                     self.where,
                     min_overlap=self.minimal_overlap,
                 )
+                self.kmer_chunks = None
+                self.kmer_chunks_bytes = None
+                if not self.accept_overlap:
+                    # the prefilter is only valid if the full adapter has to match,
+                    # partial occurences may miss chunks without being in error
+                    self.kmer_chunks = kmer_chunks(
+                        self.adapter_sequence, self.maximal_number_of_errors + 1
+                    )
+                    self.kmer_chunks_bytes = [chunk.encode("ascii") for chunk in self.kmer_chunks]
             if self.index_adapter_end:
                 self.correct_for_adapter_location = (
                     lambda pos: self.adapter_sequence_length + pos
@@ -139,16 +188,17 @@ class Adapter:
         else:
             return self.get_position_from_adaptermatch(AdapterMatch(*alignment))
 
-    def exact_locate(self, sequence: str) -> Union[int, None]:
+    def exact_locate(self, sequence: Union[str, bytes]) -> Union[int, None]:
         sequence = self.orient_read(sequence)
-        pos = sequence.find(self.adapter_sequence)  # find the exact sequence is faster
+        adapter = self.adapter_bytes if isinstance(sequence, bytes) else self.adapter_sequence
+        pos = sequence.find(adapter)  # find the exact sequence is faster
         if pos >= 0:
             ret = self.correct_for_adapter_location(pos) * self.factor
         else:
             ret = None
         return ret
 
-    def cutadapt_locate(self, sequence: str) -> Union[int, None]:
+    def cutadapt_locate(self, sequence: Union[str, bytes]) -> Union[int, None]:
         """
         locate returns the first occurence of the adapter_sequence in
         sequence.
@@ -172,10 +222,20 @@ class Adapter:
             If no adapter is located, return False.
         """
         sequence = self.orient_read(sequence)
-        pos = sequence.find(self.adapter_sequence)
+        if isinstance(sequence, bytes):
+            adapter, chunks = self.adapter_bytes, self.kmer_chunks_bytes
+        else:
+            adapter, chunks = self.adapter_sequence, self.kmer_chunks
+        pos = sequence.find(adapter)
         if pos >= 0:
             ret = self.correct_for_adapter_location(pos) * self.factor
+        elif chunks is not None and not any(chunk in sequence for chunk in chunks):
+            # a match with at most k errors must contain one of the k+1
+            # adapter chunks exactly, no need to run the alignment
+            ret = None
         else:
+            if isinstance(sequence, bytes):
+                sequence = sequence.decode()  # cutadapt's Aligner operates on str
             pos = self.cutadapt_match(sequence)
             if pos is not None:
                 ret = pos * self.factor
@@ -183,5 +243,26 @@ class Adapter:
                 ret = None
         return ret
 
+    def locate_batch(self, sequences) -> List[Union[int, None]]:
+        """
+        locate_batch locates the adapter in every sequence of a batch.
+
+        Equivalent to calling locate per sequence, with the method
+        dispatch hoisted out of the loop; intended for the
+        structure-of-arrays columns of a FragmentBatch (e.g. seqs1).
+
+        Parameters
+        ----------
+        sequences : Iterable[str]
+            The sequences to search.
+
+        Returns
+        -------
+        List[Union[int, None]]
+            The locate result for each sequence, in order.
+        """
+        locate = self.locate
+        return [locate(sequence) for sequence in sequences]
+
     def locate_null(self, sequence: str) -> Union[int, None]:
         return 0
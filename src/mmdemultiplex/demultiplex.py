@@ -20,6 +20,13 @@ from .util import Fragment, get_fastq_iterator, TemporaryToPermanent
 from pypipegraph import Job
 from .samples import FASTQsFromJobSelect
 
+try:
+    # optional: a single automaton pass per read replaces the per-sample
+    # exact barcode scans when demultiplexing many samples at once
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 __author__ = "Marco Mernberger"
 __copyright__ = "Copyright (c) 2020 Marco Mernberger"
 __license__ = "mit"
@@ -78,15 +85,62 @@ class Demultiplexer:
         for key, df_1_row in self.barcode_df.iterrows():
             parameters = df_1_row.to_dict()
             self.decision_callbacks[key] = self.strategy(**parameters)
-
-    def get_fastq_iterator(self) -> Callable:
-        return get_fastq_iterator(self.is_paired)
+        self._initialize_barcode_prefilter()
+
+    def _initialize_barcode_prefilter(self) -> None:
+        """
+        Builds an Aho-Corasick automaton over all start barcodes that have
+        to occur verbatim (no errors, no partial overlap allowed). Those
+        samples can only match a fragment whose sequence contains their
+        barcode, so _decide_on_barcode finds all candidate barcodes in one
+        automaton pass per read and skips the rest instead of running every
+        sample's match_and_trim. Samples whose key is not in
+        self.gated_start_barcodes are always tried.
+        """
+        self.barcode_automaton = None
+        self.gated_start_barcodes = {}
+        if ahocorasick is None:
+            return
+        gated = {}
+        for key, strategy in self.decision_callbacks.items():
+            start_barcode = getattr(strategy, "start_barcode", None)
+            if (
+                start_barcode
+                and getattr(strategy, "maximal_errors_start", None) == 0
+                and getattr(strategy, "minimal_overlap_start", None) == len(start_barcode)
+            ):
+                gated[key] = start_barcode
+        if not gated:
+            return
+        automaton = ahocorasick.Automaton()
+        for start_barcode in gated.values():
+            automaton.add_word(start_barcode, start_barcode)
+        automaton.make_automaton()
+        self.barcode_automaton = automaton
+        self.gated_start_barcodes = gated
+
+    def get_fastq_iterator(self, batched: bool = False) -> Callable:
+        return get_fastq_iterator(self.is_paired, batched=batched)
 
     def _decide_on_barcode(self, fragment: Fragment):
-        for key in self.decision_callbacks:
-            accepted = self.decision_callbacks[key].match_and_trim(fragment)
-            if accepted:
-                return key, accepted
+        if self.barcode_automaton is not None:
+            present = set()
+            for read in fragment:
+                for _end, barcode in self.barcode_automaton.iter(read.Sequence):
+                    present.add(barcode)
+            gated = self.gated_start_barcodes
+            for key in self.decision_callbacks:
+                barcode = gated.get(key)
+                if barcode is not None and barcode not in present:
+                    continue  # its barcode occurs nowhere, cannot match
+                accepted = self.decision_callbacks[key].match_and_trim(fragment)
+                if accepted:
+                    return key, accepted
+        else:
+            for key in self.decision_callbacks:
+                accepted = self.decision_callbacks[key].match_and_trim(fragment)
+                if accepted:
+                    return key, accepted
         return "discarded", fragment
 
     def __write_fragment(
@@ -126,13 +180,13 @@ class Demultiplexer:
                         TemporaryToPermanent(f).open("w") for f in files_to_create[sample_name]
                     ]
                 # iterate over the input files and decide on each fragment, then write to temporary file
-                read_iterator = self.get_fastq_iterator()
+                read_iterator = self.get_fastq_iterator(batched=True)
                 for files_tuple in self.input_files:
-                    for fragment in read_iterator(files_tuple):
-                        key, accepted = self._decide_on_barcode(fragment)
-                        print(fragment.Read1.Name, key, accepted)
-                        sample_name = f"{self.name}_{key}"
-                        self.__write_fragment(accepted, temporary_files[sample_name])
+                    for batch in read_iterator(files_tuple):
+                        for fragment in batch:
+                            key, accepted = self._decide_on_barcode(fragment)
+                            sample_name = f"{self.name}_{key}"
+                            self.__write_fragment(accepted, temporary_files[sample_name])
                 # close open file handle
                 for key in temporary_files:
                     for f in temporary_files[key]:
@@ -9,10 +9,9 @@ from pandas import DataFrame
 from dataclasses import dataclass, replace
 import pandas as pd
 import tempfile
-import shutil
+import os
 import pypipegraph as ppg
 import collections
-import mbf_align
 import re
 
 try:
@@ -30,6 +29,20 @@ __license__ = "mit"
 
 rev_comp_table = maketrans(b"ACBDGHKMNSRUTWVYacbdghkmnsrutwvy", b"TGVHCDMKNSYAAWBRTGVHCDMKNSYAAWBR")
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+try:
+    from ._revcomp import revcomp as _revcomp
+except ImportError:
+    _revcomp = None
+
+try:
+    # ISA-L's igzip (hardware CRC, vectorized inflate) decompresses gzip
+    # 2-3x faster than the stdlib and is a drop-in replacement
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
 
 AdapterMatch = collections.namedtuple(
     "AdapterMatch", ["astart", "astop", "rstart", "rstop", "matches", "errors"]
@@ -40,6 +53,8 @@ AdapterMatch = collections.namedtuple(
 class Read:
     """Data class for sequencing reads"""
 
+    __slots__ = ("Name", "Sequence", "Quality")
+
     Name: str
     Sequence: str
     Quality: str
@@ -48,23 +63,97 @@ class Read:
 class Fragment:
     """Data class for single-end and paired-end Reads/Fragments."""
 
+    __slots__ = ("reads",)
+
     def __init__(self, *reads: Read):
-        self.reads = reads
-        self.Read1 = self.reads[0]
-        if len(reads) == 2:
-            self.Read2 = self.reads[1]
+        self.reads = list(reads)
+
+    @property
+    def Read1(self) -> Read:
+        return self.reads[0]
+
+    @Read1.setter
+    def Read1(self, read: Read) -> None:
+        self.reads[0] = read
+
+    @property
+    def Read2(self) -> Read:
+        if len(self.reads) < 2:
+            raise AttributeError("single end fragment has no Read2")
+        return self.reads[1]
+
+    @Read2.setter
+    def Read2(self, read: Read) -> None:
+        if len(self.reads) < 2:
+            raise AttributeError("single end fragment has no Read2")
+        self.reads[1] = read
 
     def __iter__(self):
         for read in self.reads:
             yield read
 
     def copy(self):
-        return Fragment(replace(self.Read1), replace(self.Read2))
+        return Fragment(*(replace(read) for read in self.reads))
+
+
+class FragmentBatch:
+    """
+    Structure-of-arrays storage for a batch of fragments.
+
+    Holds the read fields in six parallel lists instead of one
+    Read/Fragment object pair per record, so filling a batch from the
+    fastq parser allocates no per-record objects. Fragments are only
+    materialized on access.
+    """
+
+    __slots__ = ("names1", "seqs1", "quals1", "names2", "seqs2", "quals2", "paired")
+
+    def __init__(self, paired: bool):
+        self.paired = paired
+        self.names1 = []
+        self.seqs1 = []
+        self.quals1 = []
+        self.names2 = []
+        self.seqs2 = []
+        self.quals2 = []
+
+    def append_single(self, record) -> None:
+        name, seq, qual = record
+        self.names1.append(name)
+        self.seqs1.append(seq)
+        self.quals1.append(qual)
+
+    def append_paired(self, record1, record2) -> None:
+        self.append_single(record1)
+        name, seq, qual = record2
+        self.names2.append(name)
+        self.seqs2.append(seq)
+        self.quals2.append(qual)
+
+    def __len__(self) -> int:
+        return len(self.names1)
+
+    def __getitem__(self, index: int) -> Fragment:
+        read1 = Read(self.names1[index], self.seqs1[index], self.quals1[index])
+        if self.paired:
+            return Fragment(
+                read1, Read(self.names2[index], self.seqs2[index], self.quals2[index])
+            )
+        return Fragment(read1)
+
+    def __iter__(self) -> Fragment:
+        for index in range(len(self.names1)):
+            yield self[index]
 
 
 class TemporaryToPermanent:
     def __init__(self, permanent_file: Path):
         self.permanent_file = permanent_file
+        # pathlib re-derives these on every access and the demultiplexer
+        # creates one instance per output file, so compute them once
+        self._parent = permanent_file.parent
+        self._relative = permanent_file.relative_to(permanent_file.root)
+        self._parent.mkdir(parents=True, exist_ok=True)
 
     def __enter__(self):
         return self
@@ -77,16 +166,18 @@ class TemporaryToPermanent:
             self.tmp_directory.cleanup()
 
     def open(self, *args, **kwargs):
-        self.tmp_directory = tempfile.TemporaryDirectory(dir=self.permanent_file.parent)
+        self.tmp_directory = tempfile.TemporaryDirectory(dir=self._parent)
         self.tmp_path = Path(self.tmp_directory.name)
-        self.temp_file = self.tmp_path / self.permanent_file.relative_to(self.permanent_file.root)
+        self.temp_file = self.tmp_path / self._relative
         self.temp_file.parent.mkdir(exist_ok=True, parents=True)
         self.file_handle = self.temp_file.open(*args, **kwargs)
         return self
 
     def close(self):
         self.file_handle.close()
-        shutil.move(self.temp_file, self.permanent_file)
+        # the tempdir lives next to the permanent file, so this is always a
+        # same-filesystem, atomic rename - no bytes are copied
+        os.replace(self.temp_file, self.permanent_file)
         delattr(self, "file_handle")
         self.tmp_directory.cleanup()
         delattr(self, "tmp_path")
@@ -95,6 +186,9 @@ class TemporaryToPermanent:
     def write(self, *args, **kwargs):
         self.file_handle.write(*args, **kwargs)
 
+    def writelines(self, *args, **kwargs):
+        self.file_handle.writelines(*args, **kwargs)
+
     @property
     def closed(self) -> bool:
         if hasattr(self, "file_handle"):
@@ -106,6 +200,9 @@ def reverse_complement(sequence: str) -> str:
     """
     reverse_complement retuzrns the reverse complement of given sequence.
 
+    Uses the compiled single-pass kernel from _revcomp if the extension
+    was built, otherwise falls back to reverse-and-translate.
+
     Parameters
     ----------
     sequence : str
@@ -116,7 +213,31 @@ def reverse_complement(sequence: str) -> str:
     str
         Reverse complement of input sequence.
     """
-    return sequence[::-1].translate(rev_comp_table)
+    if _revcomp is not None:
+        return _revcomp(sequence, rev_comp_table)
+    # bytes.translate is a plain C loop over 1-byte data, unlike the
+    # kind-dispatching str path
+    return sequence.encode("ascii").translate(rev_comp_table)[::-1].decode("ascii")
+
+
+def reverse_complement_bytes(sequence: bytes) -> bytes:
+    """
+    reverse_complement_bytes returns the reverse complement of a bytes sequence.
+
+    Entry point for callers that already hold raw bytes (the fastq
+    parser), avoiding the str round-trip of reverse_complement.
+
+    Parameters
+    ----------
+    sequence : bytes
+        Input sequence.
+
+    Returns
+    -------
+    bytes
+        Reverse complement of input sequence.
+    """
+    return sequence.translate(rev_comp_table)[::-1]
 
 
 def get_df_callable_for_demultiplexer(
@@ -128,12 +249,16 @@ def get_df_callable_for_demultiplexer(
     trim_end_col_name: Optional[str] = None,
 ) -> DataFrame:
     def call():
-        df = df_in.copy()
-        df[fw_col_name].fillna("", inplace=True)
-        df[rv_col_name].fillna("", inplace=True)
-        whitespace = re.compile(r"\s+")
-        assert len(df[fw_col_name].unique()) == len(df)  # check if the barcodes are unique
-        df["key"] = df[sample_col_name].str.replace(whitespace, "_")
+        columns = [fw_col_name, rv_col_name, sample_col_name]
+        if trim_start_col_name is not None:
+            columns.append(trim_start_col_name)
+        if trim_end_col_name is not None:
+            columns.append(trim_end_col_name)
+        df = df_in[columns].copy(deep=False)  # no need to copy the column data
+        df[fw_col_name] = df[fw_col_name].fillna("")
+        df[rv_col_name] = df[rv_col_name].fillna("")
+        assert df[fw_col_name].is_unique  # check if the barcodes are unique
+        df["key"] = df[sample_col_name].str.replace(_WHITESPACE_RE, "_", regex=True)
         df = df.set_index("key")
 
         if trim_start_col_name is None and trim_end_col_name is None:
@@ -159,37 +284,203 @@ def get_df_callable_for_demultiplexer(
     return call
 
 
-def iterate_fastq(filename: str, reverse_reads: bool) -> Read:
-    op = mbf_align._common.BlockedFileAdaptor(filename)
-    while True:
-        try:
-            name = op.readline()[1:-1].decode()
-            seq = op.readline()[:-1].decode()
-            op.readline()
-            qual = op.readline()[:-1].decode()
-            if reverse_reads:
-                seq = seq[::-1].translate(rev_comp_table)
-                qual = qual[::-1]
-            yield Read(name, seq, qual)
-        except StopIteration:
-            break
-
-
-def get_fastq_iterator(paired) -> Callable:
-    fastq_iterator = iterate_fastq
+FASTQ_BUFFER_SIZE = 128 * 1024
+
+
+def _open_fastq(filename: str):
+    """Opens a fastq file for reading (bytes), transparently decompressing .gz inputs."""
+    filename = str(filename)
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+
+def iterate_fastq(filename: str, reverse_reads: bool, reuse: bool = False) -> Read:
+    """
+    iterate_fastq yields all Reads from a fastq file.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the fastq file.
+    reverse_reads : bool
+        If True, yield reads as reverse complements.
+    reuse : bool, optional
+        If True, the SAME Read instance is yielded for every record with
+        its fields overwritten in place, saving one allocation per read.
+        Only safe for consumers that fully process (or copy) each read
+        before advancing the iterator - never collect the yielded reads.
+        By default False.
+
+    Yields
+    -------
+    Read
+        The next read in the file.
+    """
+    records = _iterate_fastq_records(filename, reverse_reads)
+    if reuse:
+        read = Read("", "", "")
+        for name, seq, qual in records:
+            read.Name = name
+            read.Sequence = seq
+            read.Quality = qual
+            yield read
+    else:
+        _Read = Read  # local binding, looked up once instead of per record
+        for name, seq, qual in records:
+            yield _Read(name, seq, qual)
+
+
+def _iterate_fastq_records(filename: str, reverse_reads: bool) -> Tuple[str, str, str]:
+    """
+    _iterate_fastq_records yields (name, sequence, quality) tuples from a fastq file.
 
+    The reverse_reads decision is loop-invariant, so it is made once here
+    and dispatched to a specialized generator instead of being re-checked
+    for every record in the hot loop.
+    """
+    if reverse_reads:
+        return _iterate_fastq_records_rc(filename)
+    return _iterate_fastq_records_fwd(filename)
+
+
+def _iterate_fastq_records_fwd(filename: str) -> Tuple[str, str, str]:
+    """
+    _iterate_fastq_records_fwd yields (name, sequence, quality) tuples
+    from a fastq file in file orientation.
+
+    Reads the file in large chunks and locates the record-separating
+    newlines via bytes.find instead of doing four readline calls per
+    record. Since the quality line must be as long as the sequence line,
+    its end is predicted from the sequence length and only searched for
+    if that prediction does not hit a newline.
+    """
+    op = _open_fastq(filename)
+    op_read = op.read  # avoid the attribute lookup per refill
+    buffer = b""
+    pos = 0
+    while True:
+        n1 = buffer.find(b"\n", pos)  # end of name line
+        n2 = buffer.find(b"\n", n1 + 1) if n1 != -1 else -1  # end of sequence line
+        n3 = buffer.find(b"\n", n2 + 1) if n2 != -1 else -1  # end of plus line
+        n4 = -1  # end of quality line
+        if n3 != -1:
+            n4 = n3 + 1 + (n2 - n1 - 1)  # quality is as long as the sequence
+            if n4 >= len(buffer) or buffer[n4] != 0x0A:
+                n4 = buffer.find(b"\n", n3 + 1)
+        if n4 == -1:
+            # incomplete record, refill the buffer
+            chunk = op_read(FASTQ_BUFFER_SIZE)
+            if chunk:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            if n3 != -1 and n3 + 1 <= len(buffer):
+                # last record without trailing newline; <= so an empty
+                # quality line right at EOF still yields the record
+                n4 = len(buffer)
+            else:
+                break
+        name = buffer[pos + 1 : n1].decode()
+        seq = buffer[n1 + 1 : n2].decode()
+        qual = buffer[n3 + 1 : n4].decode()
+        pos = n4 + 1
+        yield name, seq, qual
+    op.close()
+
+
+def _iterate_fastq_records_rc(filename: str, _tbl=rev_comp_table) -> Tuple[str, str, str]:
+    """
+    _iterate_fastq_records_rc yields (name, sequence, quality) tuples
+    from a fastq file with the sequence reverse complemented and the
+    quality reversed.
+
+    Same chunked parsing as _iterate_fastq_records_fwd, specialized for
+    reversed reads so the forward path carries no per-record branch.
+    rev_comp_table is bound as a default argument so the per-record
+    translate uses a local instead of a module global lookup.
+    """
+    op = _open_fastq(filename)
+    op_read = op.read  # avoid the attribute lookup per refill
+    buffer = b""
+    pos = 0
+    while True:
+        n1 = buffer.find(b"\n", pos)  # end of name line
+        n2 = buffer.find(b"\n", n1 + 1) if n1 != -1 else -1  # end of sequence line
+        n3 = buffer.find(b"\n", n2 + 1) if n2 != -1 else -1  # end of plus line
+        n4 = -1  # end of quality line
+        if n3 != -1:
+            n4 = n3 + 1 + (n2 - n1 - 1)  # quality is as long as the sequence
+            if n4 >= len(buffer) or buffer[n4] != 0x0A:
+                n4 = buffer.find(b"\n", n3 + 1)
+        if n4 == -1:
+            # incomplete record, refill the buffer
+            chunk = op_read(FASTQ_BUFFER_SIZE)
+            if chunk:
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            if n3 != -1 and n3 + 1 <= len(buffer):
+                # last record without trailing newline; <= so an empty
+                # quality line right at EOF still yields the record
+                n4 = len(buffer)
+            else:
+                break
+        name = buffer[pos + 1 : n1].decode()
+        seq = buffer[n1 + 1 : n2].translate(_tbl)[::-1].decode()
+        qual = buffer[n3 + 1 : n4][::-1].decode()
+        pos = n4 + 1
+        yield name, seq, qual
+    op.close()
+
+
+FRAGMENT_BATCH_SIZE = 512
+
+
+def get_fastq_iterator(paired, batched: bool = False) -> Callable:
     def _iterreads_paired_end(tuple_of_files: Tuple[Path]) -> Fragment:
-        for reads in zip(
-            fastq_iterator(str(tuple_of_files[0]), reverse_reads=False),
-            fastq_iterator(str(tuple_of_files[1]), reverse_reads=False),
-        ):
-            yield Fragment(*reads)
+        # drive both record generators directly instead of zipping two
+        # Read-yielding wrappers, one generator frame less per mate
+        records1 = _iterate_fastq_records(str(tuple_of_files[0]), reverse_reads=False)
+        records2 = _iterate_fastq_records(str(tuple_of_files[1]), reverse_reads=False)
+        _Read, _Fragment = Read, Fragment  # local bindings for the hot loop
+        # zip ends the loop on exhaustion inside the C loop driver, no
+        # per-iteration try/except StopIteration in bytecode
+        for (name1, seq1, qual1), (name2, seq2, qual2) in zip(records1, records2):
+            yield _Fragment(_Read(name1, seq1, qual1), _Read(name2, seq2, qual2))
 
     def _iterreads_single_end(filetuple) -> Fragment:
-        for read in fastq_iterator(str(filetuple[0]), reverse_reads=False):
-            yield Fragment(read)
+        _Read, _Fragment = Read, Fragment  # local bindings for the hot loop
+        for name, seq, qual in _iterate_fastq_records(str(filetuple[0]), reverse_reads=False):
+            yield _Fragment(_Read(name, seq, qual))
 
-    if paired:
-        return _iterreads_paired_end
-    else:
-        return _iterreads_single_end
+    if not batched:
+        if paired:
+            return _iterreads_paired_end
+        else:
+            return _iterreads_single_end
+
+    def _iterreads_batched(files_tuple) -> FragmentBatch:
+        # yielding batches amortizes the per-record generator resumption
+        # cost over FRAGMENT_BATCH_SIZE reads; the batch is filled
+        # straight from the parsed records without per-read objects
+        batch = FragmentBatch(paired)
+        if paired:
+            for record1, record2 in zip(
+                _iterate_fastq_records(str(files_tuple[0]), reverse_reads=False),
+                _iterate_fastq_records(str(files_tuple[1]), reverse_reads=False),
+            ):
+                batch.append_paired(record1, record2)
+                if len(batch) == FRAGMENT_BATCH_SIZE:
+                    yield batch
+                    batch = FragmentBatch(paired)
+        else:
+            for record in _iterate_fastq_records(str(files_tuple[0]), reverse_reads=False):
+                batch.append_single(record)
+                if len(batch) == FRAGMENT_BATCH_SIZE:
+                    yield batch
+                    batch = FragmentBatch(paired)
+        if len(batch):
+            yield batch
+
+    return _iterreads_batched
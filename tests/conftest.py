@@ -190,25 +190,10 @@ test_reads_pe = {
 }
 
 
-class MockBlockedFileAdapter:
-    def __init__(self, filename):
-        self.filename = filename
-        if "_R2_" in self.filename:
-            self.file_content = io.BytesIO(R2.encode())
-        else:
-            self.file_content = io.BytesIO(R1.encode())
-        self.file_iterator = None
-
-    def iterator(self):
-        for line in self.file_content.readlines():
-            if line == "+\n":
-                continue
-            yield line
-
-    def readline(self):
-        if self.file_iterator is None:
-            self.file_iterator = self.iterator()
-        return next(self.file_iterator)
+def mock_open_fastq(filename):
+    if "_R2_" in str(filename):
+        return io.BytesIO(R2.encode())
+    return io.BytesIO(R1.encode())
 
 
 class DummySample:
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from mmdemultiplex.adapters import Adapter, WHERE_START, WHERE_END, AdapterMatch
+from mmdemultiplex.adapters import Adapter, WHERE_START, WHERE_END, AdapterMatch, kmer_chunks
 
 __author__ = "MarcoMernberger"
 __copyright__ = "MarcoMernberger"
@@ -361,6 +361,47 @@ def test_locate():
     assert adapter.locate(test) is None
 
 
+def test_kmer_chunks():
+    assert kmer_chunks("ADAPTER", 1) == ["ADAPTER"]
+    assert kmer_chunks("ADAPTER", 2) == ["ADAP", "TER"]
+    assert kmer_chunks("ADAPTER", 3) == ["ADA", "PT", "ER"]
+
+
+def test_kmer_prefilter():
+    adapter_sequence = "ADAPTER"
+    adapter = Adapter(adapter_sequence, maximal_number_of_errors=1)
+    assert adapter.kmer_chunks == ["ADAP", "TER"]
+    # prefilter passes, one error is found
+    assert adapter.locate("TTT_ADAPTRR_TTT") == 11
+    # prefilter rejects without alignment
+    assert adapter.locate("TTT_TTTTTTT_TTT") is None
+    # prefilter passes, but the alignment rejects
+    assert adapter.locate("TTT_ADAPRRR_TTT") is None
+    # partial overlap adapters may miss chunks without being in error
+    adapter = Adapter(adapter_sequence, maximal_number_of_errors=1, minimal_overlap=4)
+    assert adapter.kmer_chunks is None
+
+
+def test_locate_batch():
+    adapter = Adapter("ADAPTER", maximal_number_of_errors=1)
+    sequences = ["TCA_ADAPTER_TTT", "TCA_ADAPTRR_TTT", "TCA_TTTTTTT_TTT"]
+    assert adapter.locate_batch(sequences) == [11, 11, None]
+    assert adapter.locate_batch([]) == []
+
+
+def test_locate_bytes():
+    adapter = Adapter("ADAPTER")
+    assert adapter.adapter_bytes == b"ADAPTER"
+    assert adapter.locate(b"TCA_ADAPTER_TTT") == 11
+    assert adapter.locate(b"TCA_TTTTTTT_TTT") is None
+    adapter = Adapter("ADAPTER", maximal_number_of_errors=1)
+    assert adapter.kmer_chunks_bytes == [b"ADAP", b"TER"]
+    assert adapter.locate(b"TCA_ADAPTRR_TTT") == 11
+    assert adapter.locate(b"TCA_TTTTTTT_TTT") is None
+    adapter = Adapter("ADAPTER", maximal_number_of_errors=1, find_right_most_occurence=True)
+    assert adapter.locate(b"TCA_ADAPTER_TTT") == adapter.locate("TCA_ADAPTER_TTT")
+
+
 def test_locate_0():
     adapter_sequence = ""
     adapter = Adapter(adapter_sequence)
@@ -15,7 +15,7 @@ from pathlib import Path
 from unittest.mock import patch
 from pypipegraph import Job
 from conftest import (
-    MockBlockedFileAdapter,
+    mock_open_fastq,
     DummyDemultiplexInputSample,
 )
 
@@ -121,7 +121,7 @@ def test_parameter_string(tmp_path, pe_sample):
 
 
 def test_fastq_iterator(tmp_path, pe_sample, se_sample):
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer = Demultiplexer(pe_sample, barcode_df_callback, output_folder=tmp_path)
         iterator = demultiplexer.get_fastq_iterator()
         assert callable(iterator)
@@ -131,7 +131,7 @@ def test_fastq_iterator(tmp_path, pe_sample, se_sample):
                 assert hasattr(fragment, "Read1")
                 assert hasattr(fragment, "Read2")
                 assert hasattr(fragment, "reads")
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer = Demultiplexer(se_sample, barcode_df_callback, output_folder=tmp_path)
         iterator = demultiplexer.get_fastq_iterator()
         assert callable(iterator)
@@ -175,7 +175,7 @@ def test_do_demultiplex_pe(tmp_path, pe_sample):
             / f"{discarded_sample_name}_R2_.fastq",
         ),
     }
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
         job = demultiplexer.do_demultiplex()
         ppg.run_pipegraph()
@@ -245,7 +245,7 @@ def test_do_demultiplex_se(tmp_path, se_sample):
             / f"{discarded_sample_name}_R1_.fastq",
         ),
     }
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer = Demultiplexer(se_sample, barcode_df_callback, output_folder=tmp_path)
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
         job = demultiplexer.do_demultiplex()
@@ -265,7 +265,7 @@ def test_do_demultiplex_se(tmp_path, se_sample):
 
 
 def test_decide_on_barcode(tmp_path, pe_sample):
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         fragments = []
         demultiplexer = Demultiplexer(pe_sample, barcode_df_callback, output_folder=tmp_path)
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
@@ -281,10 +281,49 @@ def test_decide_on_barcode(tmp_path, pe_sample):
         assert second_result[1] == fragments[1]
 
 
+def test_barcode_prefilter(tmp_path, pe_sample):
+    pytest.importorskip("ahocorasick")
+    from mmdemultiplex.util import Read
+
+    demultiplexer = Demultiplexer(pe_sample, barcode_df_callback, output_folder=tmp_path)
+    assert demultiplexer.gated_start_barcodes == {"Sample1": "ATCG"}
+    assert demultiplexer.barcode_automaton is not None
+    with_barcode = Fragment(
+        Read("r1", "ATCGAAAA", "FFFFFFFF"), Read("r2", "TTCGAAAA", "FFFFFFFF")
+    )
+    key, accepted = demultiplexer._decide_on_barcode(with_barcode)
+    assert key == "Sample1"
+    without_barcode = Fragment(
+        Read("r1", "TTTTTTTT", "FFFFFFFF"), Read("r2", "TTTTTTTT", "FFFFFFFF")
+    )
+    key, accepted = demultiplexer._decide_on_barcode(without_barcode)
+    assert key == "discarded"
+    # the prefilter skips match_and_trim entirely if the barcode is absent
+    calls = []
+
+    class Spy:
+        def match_and_trim(self, fragment):
+            calls.append(fragment)
+            return False
+
+    demultiplexer.decision_callbacks["Sample1"] = Spy()
+    demultiplexer._decide_on_barcode(without_barcode)
+    assert calls == []
+    with_barcode = Fragment(  # match_and_trim trims in place, start fresh
+        Read("r1", "ATCGAAAA", "FFFFFFFF"), Read("r2", "TTCGAAAA", "FFFFFFFF")
+    )
+    demultiplexer._decide_on_barcode(with_barcode)
+    assert calls == [with_barcode]
+    # samples the automaton knows nothing about are always tried
+    demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
+    key, accepted = demultiplexer._decide_on_barcode(without_barcode)
+    assert key == "discarded"
+
+
 @pytest.mark.usefixtures("new_pipegraph")
 def test__make_samples(pe_sample, tmp_path):
     demultiplexer = Demultiplexer(pe_sample, barcode_df_callback, output_folder=tmp_path)
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
         job = demultiplexer.do_demultiplex()
         demultiplexed_samples = demultiplexer._make_samples()
@@ -301,7 +340,7 @@ def test_get_samples(pe_sample, tmp_path):
         raise ValueError("this should not be called")
 
     demultiplexer = Demultiplexer(pe_sample, barcode_df_callback, output_folder=tmp_path)
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
         demultiplexer.do_demultiplex()
         demultiplexed_samples = demultiplexer.get_samples()
@@ -321,7 +360,7 @@ def test_get_samples(pe_sample, tmp_path):
 @pytest.mark.usefixtures("new_pipegraph")
 def test_get_samples_se(se_sample, tmp_path):
     demultiplexer = Demultiplexer(se_sample, barcode_df_callback, output_folder=tmp_path)
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         demultiplexer.decision_callbacks = {"first_read": MockDecisionCallback()}
         demultiplexer.do_demultiplex()
         demultiplexed_samples = demultiplexer.get_samples()
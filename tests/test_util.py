@@ -2,14 +2,19 @@
 from mmdemultiplex.util import (
     Read,
     Fragment,
+    FragmentBatch,
     reverse_complement,
+    reverse_complement_bytes,
     TemporaryToPermanent,
     iterate_fastq,
     get_fastq_iterator,
+    get_df_callable_for_demultiplexer,
 )
+import io
+import pandas as pd
 from pathlib import Path
 from unittest.mock import patch
-from conftest import MockBlockedFileAdapter
+from conftest import mock_open_fastq
 
 __author__ = "MarcoMernberger"
 __copyright__ = "MarcoMernberger"
@@ -137,12 +142,67 @@ def test_temporarytopermanent_interrupt_no_context_manager(tmp_path):
         assert temp_to_perm.closed
 
 
+def test_get_fastq_iterator_batched(pe_sample, monkeypatch):
+    import mmdemultiplex.util
+
+    iterator = get_fastq_iterator(pe_sample.is_paired, batched=True)
+    assert iterator.__name__ == "_iterreads_batched"
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
+        batches = [batch for batch in iterator(pe_sample.filenames)]
+        assert len(batches) == 1
+        assert len(batches[0]) == 2
+        assert isinstance(batches[0], FragmentBatch)
+        assert isinstance(batches[0][0], Fragment)
+        assert batches[0][0].Read1.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 1:N:0:TAGCTT"
+        assert batches[0][0].Read2.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 2:N:0:TAGCTT"
+        assert len(batches[0].seqs1) == 2
+        for fragment in batches[0]:
+            assert isinstance(fragment, Fragment)
+    monkeypatch.setattr(mmdemultiplex.util, "FRAGMENT_BATCH_SIZE", 1)
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
+        batches = [batch for batch in iterator(pe_sample.filenames)]
+        assert [len(batch) for batch in batches] == [1, 1]
+
+
+def test_get_df_callable_for_demultiplexer():
+    df = pd.DataFrame(
+        {
+            "fw": ["AA", None],
+            "rv": [None, "CC"],
+            "sample": ["Sample 1", "Sample\t2"],
+            "trim_start": [1, 2],
+            "trim_end": [3, 4],
+        }
+    )
+    call = get_df_callable_for_demultiplexer(df, "fw", "rv", "sample")
+    result = call()
+    assert list(result.index) == ["Sample_1", "Sample_2"]
+    assert list(result.columns) == ["start_barcode", "end_barcode"]
+    assert result.loc["Sample_1", "start_barcode"] == "AA"
+    assert result.loc["Sample_1", "end_barcode"] == ""
+    assert df["fw"].isna().any()  # the input frame is left untouched
+    call = get_df_callable_for_demultiplexer(df, "fw", "rv", "sample", "trim_start", "trim_end")
+    result = call()
+    assert list(result.columns) == [
+        "start_barcode",
+        "end_barcode",
+        "trim_after_start",
+        "trim_before_end",
+    ]
+    assert result.loc["Sample_2", "trim_before_end"] == 4
+
+
 def test_reverse_complement():
     assert reverse_complement("ATCG") == "CGAT"
 
 
+def test_reverse_complement_bytes():
+    assert reverse_complement_bytes(b"ATCG") == b"CGAT"
+    assert reverse_complement_bytes(b"") == b""
+
+
 def test_iterate_fastq():
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         iterator = iterate_fastq("_R1_", reverse_reads=False)
         for read in iterator:
             assert read.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 1:N:0:TAGCTT"
@@ -155,7 +215,7 @@ def test_iterate_fastq():
                 == "#FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:FF:FFFFFFFFFFFFFFFFFFF:FFFFFF"
             )
             break
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         iterator = iterate_fastq("_R1_", reverse_reads=True)
         for read in iterator:
             assert read.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 1:N:0:TAGCTT"
@@ -169,19 +229,46 @@ def test_iterate_fastq():
                 ]
             )
             break
+    # an empty read right at EOF without trailing newline must still be yielded
+    raw = b"@r1\nAACG\n+\nFF:F\n@r2\n\n+\n"
+    with patch("mmdemultiplex.util._open_fastq", lambda filename: io.BytesIO(raw)):
+        reads = list(iterate_fastq("whatever", reverse_reads=False))
+        assert [(read.Name, read.Sequence, read.Quality) for read in reads] == [
+            ("r1", "AACG", "FF:F"),
+            ("r2", "", ""),
+        ]
+    with patch("mmdemultiplex.util._open_fastq", lambda filename: io.BytesIO(raw)):
+        reads = list(iterate_fastq("whatever", reverse_reads=True))
+        assert [(read.Name, read.Sequence, read.Quality) for read in reads] == [
+            ("r1", "CGTT", "F:FF"),
+            ("r2", "", ""),
+        ]
+
+
+def test_iterate_fastq_reuse():
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
+        reads = list(iterate_fastq("_R1_", reverse_reads=False))
+        assert reads[0] is not reads[1]
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
+        iterator = iterate_fastq("_R1_", reverse_reads=False, reuse=True)
+        first = next(iterator)
+        assert first.Name == reads[0].Name
+        second = next(iterator)
+        assert second is first  # the same instance, overwritten in place
+        assert first.Quality == reads[1].Quality
 
 
 def test_get_fastq_iterator(se_sample, pe_sample):
     iterator = get_fastq_iterator(pe_sample.is_paired)
     assert iterator.__name__ == "_iterreads_paired_end"
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         fragments = [fragment for fragment in iterator(pe_sample.filenames)]
         assert fragments[0].Read1.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 1:N:0:TAGCTT"
         assert fragments[0].Read2.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 2:N:0:TAGCTT"
 
     iterator = get_fastq_iterator(se_sample.is_paired)
     assert iterator.__name__ == "_iterreads_single_end"
-    with patch("mbf_align._common.BlockedFileAdaptor", MockBlockedFileAdapter):
+    with patch("mmdemultiplex.util._open_fastq", mock_open_fastq):
         fragments = [fragment for fragment in iterator(se_sample.filenames)]
         assert fragments[0].Read1.Name == "A01284:56:HNNKWDRXY:1:2101:1524:1000 1:N:0:TAGCTT"
         assert not hasattr(fragments[0], "Read2")